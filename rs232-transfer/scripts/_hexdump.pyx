@@ -0,0 +1,69 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+_hexdump.pyx
+
+Compiled hex + ASCII row formatter loaded by rs232_common.load_dump_rows().
+
+Build in place (next to rs232_common.py) with:
+  cythonize -3 -i _hexdump.pyx
+"""
+
+cdef const char *_HEX = b'0123456789ABCDEF'
+
+
+def dump_rows(const unsigned char[:] data, unsigned long long base_offset, unsigned char[:] out):
+    # Write data into out as 'OOOOOOOO: XX XX ...  |ascii|\n' rows, 16 bytes per
+    # row, exactly as rs232_common.hexdump_line formats them. Returns the number of
+    # bytes written to out.
+    cdef Py_ssize_t n = data.shape[0]
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t i, j, k, row_len, width
+    cdef unsigned long long off, tmp
+    cdef unsigned char b
+
+    for i in range(0, n, 16):
+        row_len = min(16, n - i)
+        off = base_offset + i
+
+        # offset column is at least 8 digits, wider if needed (like '{:08X}')
+        width = 8
+        tmp = off >> 32
+        while tmp:
+            width += 1
+            tmp >>= 4
+        if pos + width + 55 + row_len > out.shape[0]:
+            raise ValueError('output buffer too small')
+
+        for k in range(width - 1, -1, -1):
+            out[pos + k] = _HEX[off & 0xF]
+            off >>= 4
+        pos += width
+        out[pos] = c':'
+        out[pos + 1] = c' '
+        pos += 2
+
+        # hex column: 'XX ' per byte, space-padded to 48 characters
+        for j in range(16):
+            if j < row_len:
+                b = data[i + j]
+                out[pos] = _HEX[b >> 4]
+                out[pos + 1] = _HEX[b & 0xF]
+            else:
+                out[pos] = c' '
+                out[pos + 1] = c' '
+            out[pos + 2] = c' '
+            pos += 3
+
+        out[pos] = c' '
+        out[pos + 1] = c' '
+        out[pos + 2] = c'|'
+        pos += 3
+        for j in range(row_len):
+            b = data[i + j]
+            out[pos + j] = b if 32 <= b < 127 else c'.'
+        pos += row_len
+        out[pos] = c'|'
+        out[pos + 1] = c'\n'
+        pos += 2
+
+    return pos
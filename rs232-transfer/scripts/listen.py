@@ -11,58 +11,190 @@ Usage:
 Examples:
   python3 listen.py /dev/ttyUSB0 9600
   python3 listen.py
+  python3 listen.py --max-size 1048576   # mmap a capture of at most 1 MiB
 """
 
 import sys
 import time
+import asyncio
+import mmap
 import os
+import signal
 from datetime import datetime
 
-try:
-    import serial
-except Exception:
-    print('pyserial required: pip install pyserial')
-    raise
-
-
-def open_serial(device='/dev/ttyUSB1', baud=9600, rtscts=True):
-    # stopbits=1 -> STOPBITS_ONE
-    ser = serial.Serial(
-        port=device,
-        baudrate=baud,
-        bytesize=serial.EIGHTBITS,
-        parity=serial.PARITY_NONE,
-        stopbits=serial.STOPBITS_ONE,
-        timeout=1,
-        rtscts=rtscts
-    )
-    return ser
-
-
-def get_cts(ser):
-    # support both property and method APIs
-    try:
-        if hasattr(ser, 'getCTS'):
-            return bool(ser.getCTS())
-    except Exception:
-        pass
-    return bool(getattr(ser, 'cts', False))
+from rs232_common import (
+    ROW_BYTES, SEVENBIT_TABLE, drain, load_dump_rows, open_port, read_lines, write_all,
+)
+import serial
+
+
+# how many hex-dump lines to accumulate before flushing the log
+_LOG_FLUSH_LINES = 256
+
+# chunks the reader may queue ahead of the disk writer before it starts dropping
+_QUEUE_CHUNKS = 256
+
+# largest chunk the reader hands over (sizes the hex-dump output buffer)
+_READ_BUFSIZE = 4096
+
+# how often the monitored control line is sampled during the capture (seconds)
+_MONITOR_INTERVAL = 0.5
+
+
+async def _writer(q, fd, lf, sevenbit, do_log, written, mm=None):
+    # takes chunks off the queue and runs the disk I/O in a worker thread, so a
+    # slow disk never stalls the event loop (and with it the serial reader).
+    # str items are log comments, None means the capture is over.
+    # With mm (--max-size) chunks are copied into the mapping instead of
+    # written, and the writer stops once it is full. written[0] holds the
+    # bytes captured so far, so the caller still has it if the task dies.
+    offset = 0
+    log_lines = 0
+    if do_log:
+        dump_rows = load_dump_rows()
+        out = bytearray(ROW_BYTES * ((_READ_BUFSIZE + 15) // 16))
+        out_mv = memoryview(out)
+
+    def write_chunk(data, offset, flush_log):
+        if sevenbit:
+            # strip high bit for 7-bit text mode before it reaches the file
+            data = data.translate(SEVENBIT_TABLE)
+        if mm is None:
+            write_all(fd, data)
+        else:
+            mm[offset:offset + len(data)] = data
+        if do_log:
+            # write hex/ascii in 16-byte lines, one write per chunk
+            lf.write(out_mv[:dump_rows(data, offset, out)])
+            if flush_log:
+                lf.flush()
+
+    while True:
+        chunk = await q.get()
+        if chunk is None:
+            break
+        if isinstance(chunk, str):
+            lf.write(chunk.encode())
+            lf.flush()
+            continue
+        full = mm is not None and offset + len(chunk) >= len(mm)
+        if full:
+            chunk = chunk[:len(mm) - offset]
+        log_lines += (len(chunk) + 15) // 16
+        flush_log = log_lines >= _LOG_FLUSH_LINES
+        if flush_log:
+            log_lines = 0
+        await asyncio.to_thread(write_chunk, chunk, offset, flush_log or full)
+        offset += len(chunk)
+        written[0] = offset
+        if full:
+            print(f'Reached --max-size ({len(mm)} bytes), stopping capture')
+            break
+
+
+async def _monitor(ser, line, last, q):
+    # sample the monitored control line every _MONITOR_INTERVAL and log its
+    # changes; deadlines are on the monotonic clock so a slow wakeup does not
+    # push every later sample back
+    next_check = time.monotonic() + _MONITOR_INTERVAL
+    while True:
+        await asyncio.sleep(max(0.0, next_check - time.monotonic()))
+        next_check = max(next_check + _MONITOR_INTERVAL, time.monotonic())
+        try:
+            cur = read_monitor(ser, line)
+        except Exception:
+            cur = False
+        if cur != last:
+            q.put_nowait(f'# {line.upper()} changed: {cur} at {time.time():.3f}\n')
+            last = cur
+
 
+async def _capture(ser, fd, lf, args, monitor_line, last_monitor, do_log):
+    # the event loop wakes the reader callback only when the serial fd is
+    # readable; the writer and control-line monitor run as separate tasks.
+    # Returns True if the capture was ended by Ctrl-C.
+    loop = asyncio.get_running_loop()
+    q = asyncio.Queue()
+    written = [0]
+    dropped = 0
+    interrupted = False
 
-def get_dsr(ser):
+    def on_readable():
+        nonlocal dropped
+        try:
+            data = drain(ser, _READ_BUFSIZE)
+        except (OSError, serial.SerialException) as e:
+            fail(e)
+            return
+        if not data:
+            return
+        if q.qsize() >= _QUEUE_CHUNKS:
+            # writer is stalled; keep reading so the UART FIFO does not overrun
+            dropped += len(data)
+            print(f'Writer backlog full, dropped {len(data)} bytes ({dropped} total)')
+            return
+        q.put_nowait(data)
+
+    def fail(e):
+        # the port went away (unplugged, hung up): stop watching the fd, which
+        # would otherwise stay readable and re-fire this callback forever, and
+        # end the capture; the error is raised once the writer has drained
+        loop.remove_reader(ser_fd)
+        if not stopped.done():
+            stopped.set_exception(e)
+
+    def on_sigint():
+        # end the capture ourselves rather than letting asyncio.run cancel the
+        # writer (which drops the queue on 3.9/3.10); a second Ctrl-C gets
+        # the default KeyboardInterrupt back
+        nonlocal interrupted
+        interrupted = True
+        loop.remove_signal_handler(signal.SIGINT)
+        if not stopped.done():
+            stopped.set_result(None)
+
+    mm = None
+    if args.max_size:
+        # reserve the whole capture up front and copy chunks straight into a
+        # shared mapping; the kernel writes the pages back on its own schedule
+        os.posix_fallocate(fd, 0, args.max_size)
+        mm = mmap.mmap(fd, args.max_size, prot=mmap.PROT_READ | mmap.PROT_WRITE)
+
+    writer = asyncio.create_task(_writer(q, fd, lf, args.sevenbit, do_log, written, mm))
+    # changes only ever end up in the log, so without --log there is nothing to poll for
+    monitor = None
+    if do_log and monitor_line and monitor_line != 'none':
+        monitor = asyncio.create_task(_monitor(ser, monitor_line, last_monitor, q))
+    # the capture runs until Ctrl-C, the writer stops or the port fails
+    stopped = loop.create_future()
+    writer.add_done_callback(lambda _: stopped.done() or stopped.set_result(None))
+    ser_fd = ser.fileno()
+    loop.add_reader(ser_fd, on_readable)
+    loop.add_signal_handler(signal.SIGINT, on_sigint)
     try:
-        if hasattr(ser, 'getDSR'):
-            return bool(ser.getDSR())
-    except Exception:
-        pass
-    return bool(getattr(ser, 'dsr', False))
+        await stopped
+    finally:
+        loop.remove_reader(ser_fd)
+        loop.remove_signal_handler(signal.SIGINT)
+        if monitor:
+            monitor.cancel()
+        # let the writer finish everything already queued
+        q.put_nowait(None)
+        try:
+            await writer
+        finally:
+            if mm is not None:
+                mm.flush()
+                mm.close()
+                # drop the unused tail of the preallocated file
+                os.ftruncate(fd, written[0])
+    return interrupted
 
 
-def hexdump_line(data, base_offset=0):
-    # produce a single-line hex + ascii representation
-    hexpart = ' '.join(f'{b:02X}' for b in data)
-    asciipart = ''.join((chr(b) if 32 <= b < 127 else '.') for b in data)
-    return f'{base_offset:08X}: {hexpart:<48}  |{asciipart}|'
+def read_monitor(ser, line):
+    if line in ('cts', 'dsr'):
+        return read_lines(ser)[line]
+    return False
 
 
 def main(argv):
@@ -79,17 +211,16 @@ def main(argv):
     parser.add_argument('--sevenbit', action='store_true', help='Strip high bit from incoming bytes (7-bit text mode)')
     parser.add_argument('--no-wait-cts', action='store_true', help='Do not wait for CTS to be asserted')
     parser.add_argument('--rtscts', action='store_true', help='Enable RTS/CTS hardware flow control')
+    parser.add_argument('--max-size', type=int, default=0, help='Preallocate and mmap a capture of at most N bytes; stop when full (0 = unlimited, plain writes)')
     args = parser.parse_args(argv[1:])
+    if args.max_size < 0:
+        parser.error('--max-size must be >= 0')
 
     device = args.device
     baud = args.baud
     do_log = args.log
 
-    if not os.path.exists(device):
-        print(f'Device {device} not found')
-        sys.exit(2)
-
-    ser = open_serial(device, baud, rtscts=args.rtscts)
+    ser = open_port(device, baud, rtscts=args.rtscts)
 
     # Determine which line to assert and which to monitor
     assert_line = args.assert_line
@@ -132,36 +263,31 @@ def main(argv):
         print(f'Logging hex/ASCII to {logname}')
 
     # If monitoring a control line, poll until asserted (or timeout) unless disabled
-    def read_monitor(ser, line):
-        if line == 'cts':
-            return get_cts(ser)
-        if line == 'dsr':
-            return get_dsr(ser)
-        return False
-
     if monitor_line and monitor_line != 'none' and not args.no_wait_cts:
         print(f'Waiting for {monitor_line.upper()} to be asserted by the remote device...')
-        wait_start = time.time()
+        wait_start = time.monotonic()
         while True:
             state = read_monitor(ser, monitor_line)
             print(f'{monitor_line.upper()}={state}', end='\r')
             if state:
                 print(f'\n{monitor_line.upper()} asserted, starting capture')
                 break
-            if time.time() - wait_start > 30:
+            if time.monotonic() - wait_start > 30:
                 print(f'\nTimeout waiting for {monitor_line.upper()} (30s). Proceeding to capture.')
                 break
             time.sleep(0.1)
 
     start = time.time()
+    # the capture goes straight to the fd with os.write (or into an mmap of it
+    # with --max-size, which needs it opened read/write); only the log is buffered
+    fd = os.open(outname, (os.O_RDWR if args.max_size else os.O_WRONLY) | os.O_CREAT | os.O_TRUNC, 0o644)
     try:
-        with open(outname, 'wb') as f, (open(logname, 'w') if logname else open(os.devnull, 'w')) as lf:
-            offset = 0
+        with (open(logname, 'wb') if logname else open(os.devnull, 'wb')) as lf:
             last_monitor = read_monitor(ser, monitor_line) if monitor_line and monitor_line != 'none' else None
             if do_log:
-                lf.write(f'# start {datetime.now().isoformat()}\n')
-                lf.write(f'# monitor_line: {monitor_line}\n')
-                lf.write(f'# monitor initial: {last_monitor}\n')
+                lf.write(f'# start {datetime.now().isoformat()}\n'.encode())
+                lf.write(f'# monitor_line: {monitor_line}\n'.encode())
+                lf.write(f'# monitor initial: {last_monitor}\n'.encode())
 
             # Optionally pulse asserted line (DTR or RTS) — pulse respects assert_line
             if args.dtr_pulse and args.dtr_pulse > 0 and assert_line and assert_line != 'none':
@@ -175,53 +301,24 @@ def main(argv):
                         time.sleep(args.dtr_pulse / 1000.0)
                         ser.setRTS(False)
                     if do_log:
-                        lf.write(f'# {assert_line.upper()} pulsed for {args.dtr_pulse}ms\n')
+                        lf.write(f'# {assert_line.upper()} pulsed for {args.dtr_pulse}ms\n'.encode())
                         lf.flush()
                 except Exception as e:
                     print(f'Failed to pulse {assert_line.upper()}: {e}')
-            while True:
-                # monitor control line changes
-                if monitor_line and monitor_line != 'none':
-                    try:
-                        cur = read_monitor(ser, monitor_line)
-                    except Exception:
-                        cur = False
-                    if cur != last_monitor and do_log:
-                        lf.write(f'# {monitor_line.upper()} changed: {cur} at {time.time():.3f}\n')
-                        lf.flush()
-                        last_monitor = cur
-                    last_cts = cts
-
-                data = ser.read(1024)
-                if data:
-                    f.write(data)
-                    f.flush()
-                    if args.sevenbit:
-                        # strip high bit for 7-bit text mode
-                        data = bytes([b & 0x7F for b in data])
-                        # overwrite written data with 7-bit-stripped data
-                        f.seek(-len(data), os.SEEK_CUR)
-                        f.write(data)
-                        f.flush()
-                    if logname:
-                        # write hex/ascii in 16-byte lines
-                        for i in range(0, len(data), 16):
-                            chunk = data[i:i+16]
-                            lf.write(hexdump_line(chunk, offset + i) + '\n')
-                        lf.flush()
-                    offset += len(data)
-                else:
-                    # no data this iteration; sleep briefly
-                    time.sleep(0.05)
+            interrupted = asyncio.run(_capture(ser, fd, lf, args, monitor_line, last_monitor, do_log))
     except KeyboardInterrupt:
-        elapsed = time.time() - start
-        print('\nInterrupted — closing')
-        print(f'Wrote file: {outname}, elapsed {elapsed:.1f}s')
+        interrupted = True
     finally:
+        os.close(fd)
         try:
             ser.close()
         except Exception:
             pass
+    # the capture ended by Ctrl-C or by filling --max-size
+    elapsed = time.time() - start
+    if interrupted:
+        print('\nInterrupted — closing')
+    print(f'Wrote file: {outname}, elapsed {elapsed:.1f}s')
 
 
 if __name__ == '__main__':
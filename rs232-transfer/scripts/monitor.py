@@ -3,51 +3,30 @@
 monitor.py
 
 Monitor RS232 modem/control lines (CTS, DSR, RI, CD) and log any changes.
+
+On Linux the monitor sleeps in the TIOCMIWAIT ioctl until one of the lines
+changes; drivers that do not support it (or --poll) fall back to polling
+every --interval seconds.
 """
 import sys
 import time
 import os
+import errno
+import fcntl
+import termios
 from datetime import datetime
 
-try:
-    import serial
-except Exception:
-    print('pyserial required: pip install pyserial')
-    raise
+from rs232_common import open_port, read_lines, read_lines_fast
 
 
-def read_lines(ser):
-    # Attempt multiple APIs
-    status = {}
-    try:
-        if hasattr(ser, 'getCTS'):
-            status['cts'] = bool(ser.getCTS())
-        else:
-            status['cts'] = bool(getattr(ser, 'cts', False))
-    except Exception:
-        status['cts'] = False
-    try:
-        if hasattr(ser, 'getDSR'):
-            status['dsr'] = bool(ser.getDSR())
-        else:
-            status['dsr'] = bool(getattr(ser, 'dsr', False))
-    except Exception:
-        status['dsr'] = False
-    try:
-        if hasattr(ser, 'getRI'):
-            status['ri'] = bool(ser.getRI())
-        else:
-            status['ri'] = bool(getattr(ser, 'ri', False))
-    except Exception:
-        status['ri'] = False
-    try:
-        if hasattr(ser, 'getCD'):
-            status['cd'] = bool(ser.getCD())
-        else:
-            status['cd'] = bool(getattr(ser, 'cd', False))
-    except Exception:
-        status['cd'] = False
-    return status
+# TIOCMIWAIT is not exported by the termios module; 0x545C is the Linux value
+_TIOCMIWAIT = getattr(termios, 'TIOCMIWAIT', 0x545C)
+_TIOCM_MASK = termios.TIOCM_CTS | termios.TIOCM_DSR | termios.TIOCM_RI | termios.TIOCM_CD
+
+
+def wait_lines(fd, mask=_TIOCM_MASK):
+    # block in the kernel until one of the lines in mask changes
+    fcntl.ioctl(fd, _TIOCMIWAIT, mask)
 
 
 def main(argv):
@@ -56,18 +35,25 @@ def main(argv):
     parser = argparse.ArgumentParser(description='Monitor RS232 control lines and log changes')
     parser.add_argument('device', nargs='?', default='/dev/ttyUSB0')
     parser.add_argument('baud', nargs='?', type=int, default=9600)
-    parser.add_argument('--interval', type=float, default=0.05, help='Polling interval in seconds')
+    parser.add_argument('--interval', type=float, default=0.05, help='Polling interval in seconds (when not waiting on TIOCMIWAIT)')
+    parser.add_argument('--poll', action='store_true', help='Always poll instead of waiting for line changes')
     parser.add_argument('--out', type=str, default=None, help='Log file path (default: console)')
     args = parser.parse_args(argv[1:])
 
     device = args.device
-    if not os.path.exists(device):
-        print(f'Device {device} not found')
-        sys.exit(2)
+    ser = open_port(device, args.baud, status=2)
 
-    ser = serial.Serial(port=device, baudrate=args.baud, timeout=1)
-
-    last = read_lines(ser)
+    # prefer one TIOCMGET per poll; fall back to pyserial's per-line getters
+    # if the driver rejects the ioctl
+    fd = ser.fileno()
+    try:
+        last = read_lines_fast(fd)
+        poll = lambda: read_lines_fast(fd)
+        use_wait = not args.poll
+    except OSError:
+        last = read_lines(ser)
+        poll = lambda: read_lines(ser)
+        use_wait = False
     header = 'time,cts,dsr,ri,cd'
     if args.out:
         f = open(args.out, 'a')
@@ -79,7 +65,10 @@ def main(argv):
 
     try:
         while True:
-            cur = read_lines(ser)
+            # read the lines right before waiting: TIOCMIWAIT only wakes on
+            # changes after the call, so anything that changed since the
+            # previous wait has to be picked up here
+            cur = poll()
             if cur != last:
                 ts = datetime.now().isoformat()
                 line = f"{ts},{int(cur['cts'])},{int(cur['dsr'])},{int(cur['ri'])},{int(cur['cd'])}"
@@ -89,7 +78,16 @@ def main(argv):
                 else:
                     print(line)
                 last = cur
-            time.sleep(args.interval)
+            if use_wait:
+                try:
+                    wait_lines(fd)
+                except OSError as e:
+                    # not every USB-serial driver implements TIOCMIWAIT
+                    if e.errno not in (errno.ENOTTY, errno.EINVAL):
+                        raise
+                    use_wait = False
+            else:
+                time.sleep(args.interval)
     except KeyboardInterrupt:
         pass
     finally:
@@ -0,0 +1,184 @@
+"""
+rs232_common.py
+
+Helpers shared by the RS232 scripts in this directory: opening the port,
+reading the modem-control lines, draining the UART into a caller-owned
+buffer, hex-dump formatting and small option parsing.
+
+The hex dump uses the compiled formatter in _hexdump.pyx when it has been
+built (cythonize -3 -i _hexdump.pyx) and a pure-Python one otherwise.
+"""
+import sys
+import os
+import errno
+import binascii
+import fcntl
+import struct
+import termios
+from types import SimpleNamespace
+
+try:
+    import serial
+except ImportError:
+    print('pyserial required: pip install pyserial')
+    sys.exit(1)
+
+
+# byte translation table for ASCII views: printable characters kept, others become '.'
+PRINTABLE_TABLE = bytes(i if 32 <= i <= 126 else 0x2E for i in range(256))
+
+# byte translation table for 7-bit text mode: clears the high bit of every byte
+SEVENBIT_TABLE = bytes(i & 0x7F for i in range(256))
+
+# longest hex-dump row in bytes: 16-digit offset, ': ', 48 hex, '  |', 16 ascii, '|\n'
+ROW_BYTES = 16 + 2 + 48 + 3 + 16 + 2
+
+
+def open_port(path, baud, *, hint=None, prefix=None, status=None, **kw):
+    # open path at baud, 8N1 unless overridden by kw (passed to serial.Serial).
+    # Exits with 2 if the device does not exist and 3 if it cannot be opened
+    # (including invalid settings such as a bad baud rate, which pyserial
+    # reports as ValueError), printing hint (if given) after the error.
+    # Scripts with their own conventions pass prefix, printed before the error
+    # for every failure instead of the messages above, and/or status, the
+    # exit code for every failure.
+    settings = dict(
+        bytesize=serial.EIGHTBITS,
+        parity=serial.PARITY_NONE,
+        stopbits=serial.STOPBITS_ONE,
+        timeout=1,
+    )
+    settings.update(kw)
+    try:
+        return serial.Serial(path, baud, **settings)
+    except (OSError, serial.SerialException, ValueError) as e:
+        missing = getattr(e, 'errno', None) == errno.ENOENT
+        if prefix is not None:
+            print(f'{prefix}{e}')
+        elif missing:
+            print(f'Device {path} not found')
+        else:
+            print(f'Cannot open {path}: {e}')
+        if hint:
+            print(hint)
+        if status is None:
+            status = 2 if missing else 3
+        sys.exit(status)
+
+
+def _read_lines_slow(ser):
+    # Attempt multiple APIs
+    status = {}
+    for line in ('cts', 'dsr', 'ri', 'cd'):
+        try:
+            getter = getattr(ser, 'get' + line.upper(), None)
+            status[line] = bool(getter() if getter else getattr(ser, line, False))
+        except Exception:
+            status[line] = False
+    return status
+
+
+# scratch buffer for the TIOCMGET result, reused on every poll
+_TIOCM_BUF = bytearray(4)
+
+
+def read_lines_fast(fd, buf=_TIOCM_BUF):
+    # fetch all modem-status bits with a single TIOCMGET ioctl
+    fcntl.ioctl(fd, termios.TIOCMGET, buf)
+    v = struct.unpack('i', buf)[0]
+    return {
+        'cts': bool(v & termios.TIOCM_CTS),
+        'dsr': bool(v & termios.TIOCM_DSR),
+        'ri': bool(v & termios.TIOCM_RI),
+        'cd': bool(v & termios.TIOCM_CD),
+    }
+
+
+def read_lines(ser):
+    # CTS/DSR/RI/CD as a dict of bools; one TIOCMGET where the driver
+    # supports it, pyserial's per-line getters otherwise
+    try:
+        return read_lines_fast(ser.fileno())
+    except (OSError, AttributeError):
+        return _read_lines_slow(ser)
+
+
+def read_lines_strict(ser):
+    # like read_lines, but raises (OSError/SerialException) when the adapter
+    # cannot report the lines instead of reporting them as deasserted
+    try:
+        return read_lines_fast(ser.fileno())
+    except (OSError, AttributeError):
+        return {line: bool(getattr(ser, line)) for line in ('cts', 'dsr', 'ri', 'cd')}
+
+
+def drain(ser, limit):
+    # read whatever the UART has queued in one call (at least one byte,
+    # waiting up to the port timeout for it, at most limit); returns the bytes
+    return ser.read(min(max(ser.in_waiting, 1), limit))
+
+
+def write_all(fd, data):
+    # os.write may accept fewer bytes than offered; loop until the chunk is down
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def hexdump_line(data, base_offset=0):
+    # produce a single-line hex + ascii representation
+    hexpart = binascii.hexlify(data, b' ').decode('ascii').upper()
+    asciipart = bytes(data).translate(PRINTABLE_TABLE).decode('ascii')
+    return f'{base_offset:08X}: {hexpart:<48}  |{asciipart}|'
+
+
+def _dump_rows(data, base_offset, out):
+    # pure-Python equivalent of _hexdump.dump_rows: formats data as
+    # hexdump_line rows into out and returns the number of bytes written
+    rows = ''.join(hexdump_line(data[i:i+16], base_offset + i) + '\n'
+                   for i in range(0, len(data), 16)).encode('ascii')
+    out[:len(rows)] = rows
+    return len(rows)
+
+
+def load_dump_rows():
+    # dump_rows(data, base_offset, out) -> int; out needs ROW_BYTES per 16
+    # bytes of data. Prefers the compiled formatter from _hexdump.pyx.
+    try:
+        from _hexdump import dump_rows
+    except ImportError:
+        dump_rows = _dump_rows
+    return dump_rows
+
+
+def parse_options(argv, defaults, values, flags, doc):
+    # minimal option parsing (--opt value, --opt=value, --flag) for scripts
+    # where importing argparse would cost more than the script takes to start.
+    # values maps '--opt' to (key, converter), flags maps '--flag' to key;
+    # -h/--help prints doc.
+    opts = dict(defaults)
+    it = iter(argv)
+    for a in it:
+        name, eq, val = a.partition('=')
+        if name in values:
+            key, conv = values[name]
+            if not eq:
+                val = next(it, None)
+            if not val:
+                # no argument left on the command line, or an empty --opt=
+                print(f'Missing value for {name}')
+                sys.exit(2)
+            try:
+                opts[key] = conv(val)
+            except (TypeError, ValueError):
+                print(f'Invalid value for {name}: {val!r}')
+                sys.exit(2)
+        elif a in flags:
+            opts[flags[a]] = True
+        elif a in ('-h', '--help'):
+            print(doc)
+            sys.exit(0)
+        else:
+            print(f'Unknown option: {a} (see --help)')
+            sys.exit(2)
+    return SimpleNamespace(**opts)
@@ -7,45 +7,48 @@ Usage:
 
 Shows port configuration, control signal status, and any data received.
 """
-import argparse
+import binascii
+import select
 import sys
 import time
 
-try:
-    import serial
-except ImportError:
-    print("Missing dependency: pyserial. Install with: pip install pyserial")
-    sys.exit(1)
+from rs232_common import PRINTABLE_TABLE, open_port, parse_options, read_lines_strict
+
+# printed after the error when the port cannot be opened
+_OPEN_HINT = """
+Troubleshooting:
+  1. Check permissions: sudo usermod -aG dialout $USER (then logout/login)
+  2. Verify device exists: ls -l /dev/ttyUSB*
+  3. Check if another program is using it: lsof /dev/ttyUSB0"""
+
+
+def parse_args(argv):
+    return parse_options(
+        argv,
+        defaults={"port": "/dev/ttyUSB0", "baud": 9600},
+        values={"--port": ("port", str), "--baud": ("baud", int)},
+        flags={},
+        doc=__doc__,
+    )
 
 
 def main():
-    p = argparse.ArgumentParser(description="RS232 diagnostic tool")
-    p.add_argument("--port", default="/dev/ttyUSB0")
-    p.add_argument("--baud", type=int, default=9600)
-    args = p.parse_args()
+    args = parse_args(sys.argv[1:])
 
     print(f"=== RS232 Diagnostics for {args.port} ===\n")
 
     # Try opening with minimal settings first
-    try:
-        ser = serial.Serial(
-            args.port,
-            args.baud,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
-            stopbits=serial.STOPBITS_ONE,
-            timeout=0.1,
-            rtscts=False,
-            xonxoff=False,
-            dsrdtr=False,
-        )
-    except Exception as e:
-        print(f"ERROR: Cannot open port: {e}")
-        print("\nTroubleshooting:")
-        print("  1. Check permissions: sudo usermod -aG dialout $USER (then logout/login)")
-        print("  2. Verify device exists: ls -l /dev/ttyUSB*")
-        print("  3. Check if another program is using it: lsof /dev/ttyUSB0")
-        sys.exit(1)
+    ser = open_port(
+        args.port,
+        args.baud,
+        hint=_OPEN_HINT,
+        prefix="ERROR: Cannot open port: ",
+        status=1,
+        timeout=0.1,
+        rtscts=False,
+        xonxoff=False,
+        dsrdtr=False,
+    )
 
     print("✓ Port opened successfully")
     print(f"  Baud rate: {ser.baudrate}")
@@ -58,14 +61,11 @@ def main():
     # Check control signals
     print("Control signal status:")
     try:
-        cts = ser.cts
-        dsr = ser.dsr
-        ri = ser.ri
-        cd = ser.cd
-        print(f"  CTS (Clear To Send):    {cts}")
-        print(f"  DSR (Data Set Ready):   {dsr}")
-        print(f"  RI  (Ring Indicator):   {ri}")
-        print(f"  CD  (Carrier Detect):   {cd}")
+        lines = read_lines_strict(ser)
+        print(f"  CTS (Clear To Send):    {lines['cts']}")
+        print(f"  DSR (Data Set Ready):   {lines['dsr']}")
+        print(f"  RI  (Ring Indicator):   {lines['ri']}")
+        print(f"  CD  (Carrier Detect):   {lines['cd']}")
     except Exception as e:
         print(f"  Cannot read signals: {e}")
     print()
@@ -90,22 +90,23 @@ def main():
     bytes_received = 0
     try:
         end_time = time.time() + 10
-        while time.time() < end_time:
-            data = ser.read(1024)
+        while True:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            r, _, _ = select.select([ser.fileno()], [], [], remaining)
+            if not r:
+                continue
+            data = ser.read(max(ser.in_waiting, 1))
             if data:
                 bytes_received += len(data)
                 print(f"Received {len(data)} bytes:")
-                # Show hex dump
-                for i, b in enumerate(data):
-                    if i % 16 == 0:
-                        print(f"  {i:04X}: ", end="")
-                    print(f"{b:02X} ", end="")
-                    if (i + 1) % 16 == 0:
-                        print()
-                if len(data) % 16 != 0:
-                    print()
+                # Show hex dump, 16 bytes (48 hex chars) per row, in one write
+                hexstr = binascii.hexlify(data, b" ").decode("ascii").upper()
+                rows = [f"  {i:04X}: {hexstr[i * 3:i * 3 + 47]}" for i in range(0, len(data), 16)]
+                sys.stdout.write("\n".join(rows) + "\n")
                 # Show ASCII
-                printable = "".join(chr(b) if 32 <= b <= 126 else "." for b in data)
+                printable = data.translate(PRINTABLE_TABLE).decode("ascii")
                 print(f"  ASCII: {printable}\n")
     except KeyboardInterrupt:
         print("\nStopped by user")
@@ -5,59 +5,67 @@ RS232 echo server - receives characters from ZX Spectrum and echoes them back
 Usage:
   rs232_echo.py --port /dev/ttyUSB0 --baud 9600 --rtscts
 
+Options:
+  --port DEV       Serial port device (default /dev/ttyUSB0)
+  --baud N         Baud rate (default 9600)
+  --rtscts         Enable hardware RTS/CTS flow control
+  --timeout SECS   Read timeout in seconds (default 0.1)
+  --debug          Print every received character with its hex code
+
 Listens on serial port, prints received characters to console and echoes back to sender.
+Each burst is echoed with a single write; --debug prints every character with its hex code.
 Press Ctrl-C to exit.
 
 Requires: pyserial (pip install pyserial)
 """
-import argparse
+import select
 import sys
 
-try:
-    import serial
-except ImportError:
-    print("Missing dependency: pyserial. Install with: pip install pyserial")
-    sys.exit(1)
+from rs232_common import PRINTABLE_TABLE, open_port, parse_options
 
 
-def main():
-    p = argparse.ArgumentParser(description="RS232 echo server for ZX Spectrum")
-    p.add_argument("--port", default="/dev/ttyUSB0", help="Serial port device")
-    p.add_argument("--baud", type=int, default=9600, help="Baud rate")
-    p.add_argument("--rtscts", action="store_true", help="Enable hardware RTS/CTS flow control")
-    p.add_argument("--timeout", type=float, default=0.1, help="Read timeout (seconds)")
-    args = p.parse_args()
-
-    ser = serial.Serial(
-        args.port,
-        args.baud,
-        bytesize=serial.EIGHTBITS,
-        parity=serial.PARITY_NONE,
-        stopbits=serial.STOPBITS_ONE,
-        timeout=args.timeout,
-        rtscts=args.rtscts,
+def parse_args(argv):
+    return parse_options(
+        argv,
+        defaults={"port": "/dev/ttyUSB0", "baud": 9600, "rtscts": False, "timeout": 0.1, "debug": False},
+        values={"--port": ("port", str), "--baud": ("baud", int), "--timeout": ("timeout", float)},
+        flags={"--rtscts": "rtscts", "--debug": "debug"},
+        doc=__doc__,
     )
 
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    ser = open_port(args.port, args.baud, timeout=args.timeout, rtscts=args.rtscts)
+
     print(f"RS232 echo server listening on {args.port} at {args.baud} baud")
     print(f"Hardware flow control (RTS/CTS): {args.rtscts}")
     print("Press Ctrl-C to exit\n")
 
     try:
         while True:
-            # Read one byte at a time
-            data = ser.read(1)
-            if data:
-                # Print to console (handle non-printable chars)
-                char = data[0]
-                if 32 <= char <= 126:
-                    print(f"Received: '{chr(char)}' (0x{char:02X})")
-                else:
-                    print(f"Received: 0x{char:02X}")
-                
-                # Echo back to sender
-                ser.write(data)
-                ser.flush()
-                
+            # Wait for the port to become readable, then take whatever is queued
+            r, _, _ = select.select([ser.fileno()], [], [], args.timeout)
+            if not r:
+                continue
+            data = ser.read(ser.in_waiting or 1)
+            if not data:
+                continue
+
+            # Echo the whole burst back to sender in one write
+            ser.write(data)
+            ser.flush()
+
+            # Print to console (handle non-printable chars)
+            if args.debug:
+                for char in data:
+                    if 32 <= char <= 126:
+                        print(f"Received: '{chr(char)}' (0x{char:02X})")
+                    else:
+                        print(f"Received: 0x{char:02X}")
+            else:
+                sys.stdout.write(f"Received: {data.translate(PRINTABLE_TABLE).decode('ascii')}\n")
     except KeyboardInterrupt:
         print("\n\nExiting...")
     finally:
@@ -5,40 +5,52 @@ Simple RS232 receiver for ZX Spectrum Interface 1
 Usage:
     rs232_receive.py --port /dev/ttyUSB0 --baud 19200 --outfile capture.tap --duration 10
 
+Options:
+    --port DEV       Serial port device (default /dev/ttyUSB0)
+    --baud N         Baud rate (default 19200)
+    --outfile PATH   Capture file (default capture.bin)
+    --duration SECS  Seconds to capture (0 means until Ctrl-C)
+    --rtscts         Enable hardware RTS/CTS flow control (default off for straight DTR/CTS wiring)
+    --no-dtr         Do not assert DTR (defaults to asserted)
+    --no-rts         Do not assert RTS (defaults to asserted)
+    --timeout SECS   Read timeout in seconds (default 0.5)
+
 Reads raw bytes from serial, echoes them to the console, and writes to an output file
 until duration seconds elapse or Ctrl-C is pressed.
 
 Requires: pyserial (pip install pyserial)
 """
-import argparse
+import binascii
+import os
+import select
 import time
 import sys
 
-try:
-    import serial
-except Exception as e:
-    print("Missing dependency: pyserial. Install with: pip install pyserial")
-    raise
+from rs232_common import PRINTABLE_TABLE, drain, open_port, parse_options, read_lines_strict, write_all
+
+
+def parse_args(argv):
+    return parse_options(
+        argv,
+        defaults={
+            "port": "/dev/ttyUSB0", "baud": 19200, "outfile": "capture.bin", "duration": 0,
+            "rtscts": False, "no_dtr": False, "no_rts": False, "timeout": 0.5,
+        },
+        values={
+            "--port": ("port", str), "--baud": ("baud", int), "--outfile": ("outfile", str),
+            "--duration": ("duration", int), "--timeout": ("timeout", float),
+        },
+        flags={"--rtscts": "rtscts", "--no-dtr": "no_dtr", "--no-rts": "no_rts"},
+        doc=__doc__,
+    )
 
 
 def main():
-    p = argparse.ArgumentParser(description="RS232 receiver for ZX Spectrum Interface 1")
-    p.add_argument("--port", default="/dev/ttyUSB0")
-    p.add_argument("--baud", type=int, default=19200)
-    p.add_argument("--outfile", default="capture.bin")
-    p.add_argument("--duration", type=int, default=0, help="Seconds to capture (0 means until Ctrl-C)")
-    p.add_argument("--rtscts", action="store_true", help="Enable hardware RTS/CTS flow control (default off for straight DTR/CTS wiring)")
-    p.add_argument("--no-dtr", action="store_true", help="Do not assert DTR (defaults to asserted)")
-    p.add_argument("--no-rts", action="store_true", help="Do not assert RTS (defaults to asserted)")
-    p.add_argument("--timeout", type=float, default=0.5, help="Read timeout (seconds)")
-    args = p.parse_args()
-
-    ser = serial.Serial(
+    args = parse_args(sys.argv[1:])
+
+    ser = open_port(
         args.port,
         args.baud,
-        bytesize=serial.EIGHTBITS,
-        parity=serial.PARITY_NONE,
-        stopbits=serial.STOPBITS_ONE,
         timeout=args.timeout,
         rtscts=args.rtscts,
         xonxoff=False,
@@ -53,35 +65,40 @@ def main():
     print(f"Opened {args.port} at {args.baud} baud. rtscts={args.rtscts}")
     print(f"RTS={'high' if ser.rts else 'low'}, DTR={'high' if ser.dtr else 'low'}")
     try:
+        lines = read_lines_strict(ser)
         print(
             "Signals: CTS={} DSR={} CD={} RI={}".format(
-                ser.cts, ser.dsr, ser.cd, ser.ri
+                lines["cts"], lines["dsr"], lines["cd"], lines["ri"]
             )
         )
     except Exception:
         print("Signals: unavailable on this adapter")
     end_time = time.time() + args.duration if args.duration > 0 else None
 
-    with open(args.outfile, "wb") as f:
-        try:
-            while True:
-                if end_time and time.time() > end_time:
-                    print("Duration elapsed, exiting")
-                    break
-                data = ser.read(1024)
-                if data:
-                    f.write(data)
-                    f.flush()
-
-                    # Echo to console in a readable way
-                    printable = "".join(chr(b) if 32 <= b <= 126 else "." for b in data)
-                    hex_dump = " ".join(f"{b:02X}" for b in data)
-                    print(f"+{len(data)} bytes | ASCII: {printable} | HEX: {hex_dump}")
-        except KeyboardInterrupt:
-            print("Interrupted by user, exiting")
-        finally:
-            ser.close()
-            print(f"Capture saved to {args.outfile}")
+    fd = os.open(args.outfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while True:
+            if end_time and time.time() > end_time:
+                print("Duration elapsed, exiting")
+                break
+            # sleep in the kernel until data arrives instead of spinning on read timeouts
+            r, _, _ = select.select([ser.fileno()], [], [], args.timeout)
+            if not r:
+                continue
+            data = drain(ser, 4096)
+            if data:
+                write_all(fd, data)
+
+                # Echo to console in a readable way
+                printable = data.translate(PRINTABLE_TABLE).decode("ascii")
+                hex_dump = binascii.hexlify(data, b" ").decode("ascii").upper()
+                print(f"+{len(data)} bytes | ASCII: {printable} | HEX: {hex_dump}")
+    except KeyboardInterrupt:
+        print("Interrupted by user, exiting")
+    finally:
+        os.close(fd)
+        ser.close()
+        print(f"Capture saved to {args.outfile}")
 
 
 if __name__ == '__main__':
@@ -19,28 +19,13 @@ Notes:
 
 import sys
 import time
-import os
-try:
-    import serial
-except Exception as e:
-    print('pyserial required. Install with: pip install pyserial')
-    raise
-
-
-def open_port(path, baud, rtscts=False, dsrdtr=False, timeout=1):
-    if not os.path.exists(path):
-        print(f'Device {path} not found')
-        sys.exit(2)
-    try:
-        s = serial.Serial(path, baud, timeout=timeout, rtscts=rtscts, dsrdtr=dsrdtr)
-        return s
-    except Exception as e:
-        print('Failed to open serial port:', e)
-        sys.exit(3)
+
+from rs232_common import open_port, read_lines_strict
 
 
 def print_lines(s):
-    print('CTS:', s.cts, 'DSR:', s.dsr, 'RI:', s.ri, 'CD:', s.cd)
+    lines = read_lines_strict(s)
+    print('CTS:', lines['cts'], 'DSR:', lines['dsr'], 'RI:', lines['ri'], 'CD:', lines['cd'])
 
 
 def loopback_test(s):